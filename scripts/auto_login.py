@@ -6,16 +6,20 @@ ClawCloud 自动登录脚本
 - Telegram 通知
 """
 
+import asyncio
 import base64
 import os
 import random
 import re
+import shutil
 import sys
 import time
 from urllib.parse import urlparse
 
 import requests
-from playwright.sync_api import sync_playwright
+from playwright.async_api import Error as PlaywrightError
+from playwright.async_api import TimeoutError as PlaywrightTimeout
+from playwright.async_api import async_playwright
 
 # ==================== 配置 ====================
 # 代理配置 (留空则不使用)
@@ -27,6 +31,21 @@ LOGIN_ENTRY_URL = "https://ap-southeast-1.run.claw.cloud/login"
 SIGNIN_URL = f"{LOGIN_ENTRY_URL}/signin"
 DEVICE_VERIFY_WAIT = 30  # Mobile验证 默认等 30 秒
 TWO_FACTOR_WAIT = int(os.environ.get("TWO_FACTOR_WAIT", "120"))  # 2FA验证 默认等 120 秒
+# 浏览器 profile 目录（本地多次运行可复用 GitHub/ClawCloud 登录状态）
+USER_DATA_DIR = os.environ.get("USER_DATA_DIR", ".playwright-profile")
+# 每一步都截图（调试用），默认只截需要发到 Telegram 的页面
+DEBUG_SHOTS = os.environ.get("DEBUG_SHOTS", "").lower() in ("1", "true")
+# 不需要的资源直接拦截，减少流量并让 networkidle 更快
+# (样式表保留，否则可见性判断和截图都会出问题)
+# 只对匹配的 URL 注册拦截，其余请求不经过 Python
+BLOCKED_URL_RE = re.compile(
+    r"^https?://([^/]*\.)?(google-analytics\.com|googletagmanager\.com|doubleclick\.net|sentry\.io)/"
+    r"|\.(png|jpe?g|gif|webp|svg|ico|woff2?|ttf|otf|eot|mp4|webm|mp3)(\?.*)?$",
+    re.I
+)
+
+# 日志级别图标
+LOG_ICONS = {"INFO": "ℹ️", "SUCCESS": "✅", "ERROR": "❌", "WARN": "⚠️", "STEP": "🔹"}
 
 
 class Telegram:
@@ -185,42 +204,81 @@ class AutoLogin:
         self.shots = []
         self.logs = []
         self.n = 0
+        self._locators = {}  # (page, selector) -> Locator
         
         # 区域相关
         self.detected_region = 'eu-central-1'  # 检测到的区域，如 "ap-southeast-1"
         self.region_base_url = 'https://eu-central-1.run.claw.cloud'  # 检测到的区域基础 URL
         
     def log(self, msg, level="INFO"):
-        icons = {"INFO": "ℹ️", "SUCCESS": "✅", "ERROR": "❌", "WARN": "⚠️", "STEP": "🔹"}
-        line = f"{icons.get(level, '•')} {msg}"
+        line = f"{LOG_ICONS.get(level, '•')} {msg}"
         print(line)
         self.logs.append(line)
     
-    def shot(self, page, name):
+    def loc(self, page, sels):
+        """获取 Locator（按页面缓存），selector 列表合并成一个查询"""
+        key = (page, sels if isinstance(sels, str) else tuple(sels))
+        if key not in self._locators:
+            sel = sels if isinstance(sels, str) else ', '.join(sels)
+            self._locators[key] = page.locator(sel)
+        return self._locators[key]
+    
+    async def visible(self, page, sels, timeout):
+        """
+        等到有可见元素出现，返回第一个可见元素（超时抛 PlaywrightTimeout）
+        sels 为 selector 列表时只等一次，再按列表顺序（优先级）挑选
+        """
+        if not isinstance(sels, (list, tuple)):
+            el = sels.locator('visible=true').first
+            await el.wait_for(state='visible', timeout=timeout)
+            return el
+        el = self.loc(page, sels).locator('visible=true').first
+        await el.wait_for(state='visible', timeout=timeout)
+        for sel in sels:
+            candidate = self.loc(page, sel).locator('visible=true').first
+            if await candidate.count():
+                return candidate
+        return el
+    
+    async def shot(self, page, name, force=False):
+        """截图；非调试模式下只有 force=True 才会截"""
+        if not DEBUG_SHOTS and not force:
+            return None
         self.n += 1
-        f = f"{self.n:02d}_{name}.png"
+        f = f"{self.n:02d}_{name}.jpg"
         try:
-            page.screenshot(path=f)
+            await page.screenshot(path=f, full_page=False, type='jpeg', quality=60)
             self.shots.append(f)
         except:
             pass
         return f
     
-    def click(self, page, sels, desc=""):
-        for s in sels:
-            try:
-                el = page.locator(s).first
-                if el.is_visible(timeout=3000):
-                    # 模拟人类随机延迟
-                    time.sleep(random.uniform(0.5, 1.5))
-                    el.hover() # 先悬停
-                    time.sleep(random.uniform(0.2, 0.5))
-                    el.click()
-                    self.log(f"已点击: {desc}", "SUCCESS")
-                    return True
-            except:
-                pass
-        return False
+    async def click(self, page, sels, desc=""):
+        """
+        点击第一个可见元素
+        sels 可以是 selector 列表（合并成一个查询，只等一次）或现成的 Locator
+        """
+        try:
+            el = await self.visible(page, sels, 5000)
+            # 模拟人类随机延迟
+            await asyncio.sleep(random.uniform(0.5, 1.5))
+            await el.hover() # 先悬停
+            await asyncio.sleep(random.uniform(0.2, 0.5))
+            await el.click()
+            self.log(f"已点击: {desc}", "SUCCESS")
+            return True
+        except PlaywrightError:
+            return False
+    
+    def on_claw(self, url):
+        """按域名判断是否在 ClawCloud（GitHub 授权页的 redirect_uri 里也带 claw.cloud）"""
+        host = urlparse(url).hostname or ''
+        return host == 'claw.cloud' or host.endswith('.claw.cloud')
+    
+    def on_github(self, url):
+        """按域名判断是否在 GitHub"""
+        host = urlparse(url).hostname or ''
+        return host == 'github.com' or host.endswith('.github.com')
     
     def detect_region(self, url):
         """
@@ -270,10 +328,10 @@ class AutoLogin:
             return self.region_base_url
         return LOGIN_ENTRY_URL
     
-    def get_session(self, context):
+    async def get_session(self, context):
         """提取 Session Cookie"""
         try:
-            for c in context.cookies():
+            for c in await context.cookies():
                 if c['name'] == 'user_session' and 'github' in c.get('domain', ''):
                     return c['value']
         except:
@@ -300,10 +358,10 @@ class AutoLogin:
 """)
             self.log("已通过 Telegram 发送 Cookie", "SUCCESS")
     
-    def wait_device(self, page):
+    async def wait_device(self, page):
         """等待设备验证"""
         self.log(f"需要设备验证，等待 {DEVICE_VERIFY_WAIT} 秒...", "WARN")
-        self.shot(page, "设备验证")
+        shot = await self.shot(page, "设备验证", force=True)
         
         self.tg.send(f"""⚠️ <b>需要设备验证</b>
 
@@ -311,23 +369,34 @@ class AutoLogin:
 1️⃣ 检查邮箱点击链接
 2️⃣ 或在 GitHub App 批准""")
         
-        if self.shots:
-            self.tg.photo(self.shots[-1], "设备验证页面")
+        if shot:
+            self.tg.photo(shot, "设备验证页面")
         
+        # 刷新间隔，GitHub 返回 429 限流时每次加 5 秒，避免被锁更久
+        interval = 5
+        next_check = 0
         for i in range(DEVICE_VERIFY_WAIT):
-            time.sleep(1)
-            if i % 5 == 0:
-                self.log(f"  等待... ({i}/{DEVICE_VERIFY_WAIT}秒)")
-                url = page.url
-                if 'verified-device' not in url and 'device-verification' not in url:
-                    self.log("设备验证通过！", "SUCCESS")
-                    self.tg.send("✅ <b>设备验证通过</b>")
-                    return True
-                try:
-                    page.reload(timeout=10000)
-                    page.wait_for_load_state('networkidle', timeout=10000)
-                except:
-                    pass
+            await asyncio.sleep(1)
+            if i < next_check:
+                continue
+            next_check = i + interval
+            
+            self.log(f"  等待... ({i}/{DEVICE_VERIFY_WAIT}秒)")
+            url = page.url
+            if 'verified-device' not in url and 'device-verification' not in url:
+                self.log("设备验证通过！", "SUCCESS")
+                self.tg.send("✅ <b>设备验证通过</b>")
+                return True
+            try:
+                resp = await page.reload(timeout=10000)
+                if resp and resp.status == 429:
+                    interval += 5
+                    next_check = i + interval
+                    self.log(f"GitHub 限流，刷新间隔调整为 {interval} 秒", "WARN")
+                else:
+                    await page.wait_for_load_state('networkidle', timeout=10000)
+            except:
+                pass
         
         if 'verified-device' not in page.url:
             return True
@@ -336,12 +405,12 @@ class AutoLogin:
         self.tg.send("❌ <b>设备验证超时</b>")
         return False
     
-    def wait_two_factor_mobile(self, page):
+    async def wait_two_factor_mobile(self, page):
         """等待 GitHub Mobile 两步验证批准，并把数字截图提前发到电报"""
         self.log(f"需要两步验证（GitHub Mobile），等待 {TWO_FACTOR_WAIT} 秒...", "WARN")
         
         # 先截图并立刻发出去（让你看到数字）
-        shot = self.shot(page, "两步验证_mobile")
+        shot = await self.shot(page, "两步验证_mobile", force=True)
         self.tg.send(f"""⚠️ <b>需要两步验证（GitHub Mobile）</b>
 
 请打开手机 GitHub App 批准本次登录（会让你确认一个数字）。
@@ -351,7 +420,7 @@ class AutoLogin:
         
         # 不要频繁 reload，避免把流程刷回登录页
         for i in range(TWO_FACTOR_WAIT):
-            time.sleep(1)
+            await asyncio.sleep(1)
             
             url = page.url
             
@@ -369,15 +438,15 @@ class AutoLogin:
             # 每 10 秒打印一次，并补发一次截图（防止你没看到数字）
             if i % 10 == 0 and i != 0:
                 self.log(f"  等待... ({i}/{TWO_FACTOR_WAIT}秒)")
-                shot = self.shot(page, f"两步验证_{i}s")
+                shot = await self.shot(page, f"两步验证_{i}s", force=True)
                 if shot:
                     self.tg.photo(shot, f"两步验证页面（第{i}秒）")
             
             # 只在 30 秒、60 秒... 做一次轻刷新（可选，频率很低）
             if i % 30 == 0 and i != 0:
                 try:
-                    page.reload(timeout=30000)
-                    page.wait_for_load_state('domcontentloaded', timeout=30000)
+                    await page.reload(timeout=30000)
+                    await page.wait_for_load_state('domcontentloaded', timeout=30000)
                 except:
                     pass
         
@@ -385,57 +454,58 @@ class AutoLogin:
         self.tg.send("❌ <b>两步验证超时</b>")
         return False
     
-    def handle_2fa_code_input(self, page):
+    async def handle_2fa_code_input(self, page):
         """处理 TOTP 验证码输入（通过 Telegram 发送 /code 123456）"""
         self.log("需要输入验证码", "WARN")
-        shot = self.shot(page, "两步验证_code")
+        shot = await self.shot(page, "两步验证_code", force=True)
 
         # 如果是 Security Key (webauthn) 页面，尝试切换到 Authenticator App
         if 'two-factor/webauthn' in page.url:
             self.log("检测到 Security Key 页面，尝试切换...", "INFO")
             try:
                 # 点击 "More options"
-                more_options_button = page.locator('button:has-text("More options")').first
-                if more_options_button.is_visible(timeout=3000):
-                    more_options_button.click()
-                    self.log("已点击 'More options'", "SUCCESS")
-                    time.sleep(1) # 等待菜单出现
-                    self.shot(page, "点击more_options后")
-
-                    # 点击 "Authenticator app"
-                    auth_app_button = page.locator('button:has-text("Authenticator app")').first
-                    if auth_app_button.is_visible(timeout=2000):
-                        auth_app_button.click()
-                        self.log("已选择 'Authenticator app'", "SUCCESS")
-                        time.sleep(2)
-                        page.wait_for_load_state('networkidle', timeout=15000)
-                        shot = self.shot(page, "切换到验证码输入页") # 更新截图
+                more_options_button = self.loc(page, 'button:has-text("More options")').first
+                await more_options_button.wait_for(state='visible', timeout=3000)
+                await more_options_button.click()
+                self.log("已点击 'More options'", "SUCCESS")
+                await self.shot(page, "点击more_options后")
+
+                # 点击 "Authenticator app"
+                auth_app_button = self.loc(page, 'button:has-text("Authenticator app")').first
+                await auth_app_button.wait_for(state='visible', timeout=2000)
+                # 点击前就开始监听导航，否则截到的可能还是切换前的页面
+                try:
+                    async with page.expect_navigation():
+                        await auth_app_button.click()
+                except PlaywrightTimeout:
+                    pass
+                self.log("已选择 'Authenticator app'", "SUCCESS")
+                shot = await self.shot(page, "切换到验证码输入页", force=True) # 更新截图
+            except PlaywrightTimeout:
+                pass
             except Exception as e:
                 self.log(f"切换验证方式时出错: {e}", "WARN")
 
         # (保留) 先尝试点击"Use an authentication app"或类似按钮（如果在 mobile 页面）
+        more_options = [
+            'a:has-text("Use an authentication app")',
+            'a:has-text("Enter a code")',
+            'button:has-text("Use an authentication app")',
+            'button:has-text("Authenticator app")',
+            '[href*="two-factor/app"]'
+        ]
         try:
-            more_options = [
-                'a:has-text("Use an authentication app")',
-                'a:has-text("Enter a code")',
-                'button:has-text("Use an authentication app")',
-                'button:has-text("Authenticator app")',
-                '[href*="two-factor/app"]'
-            ]
-            for sel in more_options:
-                try:
-                    el = page.locator(sel).first
-                    if el.is_visible(timeout=2000):
-                        el.click()
-                        time.sleep(2)
-                        page.wait_for_load_state('networkidle', timeout=15000)
-                        self.log("已切换到验证码输入页面", "SUCCESS")
-                        shot = self.shot(page, "两步验证_code_切换后")
-                        break
-                except:
-                    pass
-        except:
-            pass
+            el = await self.visible(page, more_options, 2000)
+        except PlaywrightTimeout:
+            el = None
+        if el:
+            try:
+                async with page.expect_navigation():
+                    await el.click()
+            except PlaywrightTimeout:
+                pass
+            self.log("已切换到验证码输入页面", "SUCCESS")
+            shot = await self.shot(page, "两步验证_code_切换后", force=True)
 
         # 发送提示并等待验证码
         self.tg.send(f"""🔐 <b>需要验证码登录</b>
@@ -448,7 +518,8 @@ class AutoLogin:
             self.tg.photo(shot, "两步验证页面")
 
         self.log(f"等待验证码（{TWO_FACTOR_WAIT}秒）...", "WARN")
-        code = self.tg.wait_code(timeout=TWO_FACTOR_WAIT)
+        # 长轮询是阻塞的 requests 调用，放到线程里，别卡住 Playwright 的事件循环
+        code = await asyncio.to_thread(self.tg.wait_code, TWO_FACTOR_WAIT)
 
         if not code:
             self.log("等待验证码超时", "ERROR")
@@ -469,178 +540,191 @@ class AutoLogin:
             'input[inputmode="numeric"]'
         ]
 
-        for sel in selectors:
-            try:
-                el = page.locator(sel).first
-                if el.is_visible(timeout=2000):
-                    el.click()
-                    time.sleep(random.uniform(0.2, 0.5))
-                    el.type(code, delay=random.randint(50, 150))
-                    self.log(f"已填入验证码", "SUCCESS")
-                    time.sleep(1)
-
-                    # 优先点击 Verify 按钮，不行再 Enter
-                    submitted = False
-                    verify_btns = [
-                        'button:has-text("Verify")',
-                        'button[type="submit"]',
-                        'input[type="submit"]'
-                    ]
-                    for btn_sel in verify_btns:
-                        try:
-                            btn = page.locator(btn_sel).first
-                            if btn.is_visible(timeout=1000):
-                                btn.click()
-                                submitted = True
-                                self.log("已点击 Verify 按钮", "SUCCESS")
-                                break
-                        except:
-                            pass
+        try:
+            el = await self.visible(page, selectors, 2000)
+        except PlaywrightTimeout:
+            self.log("没找到验证码输入框", "ERROR")
+            self.tg.send("❌ <b>没找到验证码输入框</b>")
+            return False
 
-                    if not submitted:
-                        time.sleep(random.uniform(0.3, 0.8))
-                        page.keyboard.press("Enter")
-                        self.log("已按 Enter 提交", "SUCCESS")
-
-                    time.sleep(3)
-                    page.wait_for_load_state('networkidle', timeout=30000)
-                    self.shot(page, "验证码提交后")
-
-                    # 检查是否通过
-                    if "github.com/sessions/two-factor/" not in page.url:
-                        self.log("验证码验证通过！", "SUCCESS")
-                        self.tg.send("✅ <b>验证码验证通过</b>")
-                        return True
-                    else:
-                        self.log("验证码可能错误", "ERROR")
-                        self.tg.send("❌ <b>验证码可能错误，请检查后重试</b>")
-                        return False
-            except:
-                pass
+        await el.click()
+        await asyncio.sleep(random.uniform(0.2, 0.5))
+        await el.type(code, delay=random.randint(50, 150))
+        self.log(f"已填入验证码", "SUCCESS")
+        await asyncio.sleep(1)
 
-        self.log("没找到验证码输入框", "ERROR")
-        self.tg.send("❌ <b>没找到验证码输入框</b>")
-        return False
+        # 优先点击 Verify 按钮，不行再 Enter
+        submitted = False
+        verify_btns = [
+            'button:has-text("Verify")',
+            'button[type="submit"]',
+            'input[type="submit"]'
+        ]
+        try:
+            btn = await self.visible(page, verify_btns, 1000)
+            submitted = True
+        except PlaywrightTimeout:
+            pass
+
+        # 提交前就开始监听导航；2FA 页本身已是 networkidle，提交后直接等会立刻返回
+        try:
+            async with page.expect_navigation():
+                if submitted:
+                    await btn.click()
+                    self.log("已点击 Verify 按钮", "SUCCESS")
+                else:
+                    await asyncio.sleep(random.uniform(0.3, 0.8))
+                    await page.keyboard.press("Enter")
+                    self.log("已按 Enter 提交", "SUCCESS")
+        except PlaywrightTimeout:
+            self.log("提交后页面未跳转，继续检查", "WARN")
+        await self.shot(page, "验证码提交后")
+
+        # 检查是否通过
+        if "github.com/sessions/two-factor/" not in page.url:
+            self.log("验证码验证通过！", "SUCCESS")
+            self.tg.send("✅ <b>验证码验证通过</b>")
+            return True
+        else:
+            self.log("验证码可能错误", "ERROR")
+            self.tg.send("❌ <b>验证码可能错误，请检查后重试</b>")
+            return False
     
-    def login_github(self, page, context):
+    async def login_github(self, page, context):
         """登录 GitHub"""
         self.log("登录 GitHub...", "STEP")
-        self.shot(page, "github_登录页")
+        await self.shot(page, "github_登录页")
         
         try:
             # 模拟人工输入
-            user_input = page.locator('input[name="login"]')
-            user_input.click()
-            time.sleep(random.uniform(0.3, 0.8))
-            user_input.type(self.username, delay=random.randint(30, 100))
+            user_input = self.loc(page, 'input[name="login"]')
+            await user_input.click()
+            await asyncio.sleep(random.uniform(0.3, 0.8))
+            await user_input.type(self.username, delay=random.randint(30, 100))
 
-            time.sleep(random.uniform(0.5, 1.0))
+            await asyncio.sleep(random.uniform(0.5, 1.0))
 
-            pass_input = page.locator('input[name="password"]')
-            pass_input.click()
-            time.sleep(random.uniform(0.3, 0.8))
-            pass_input.type(self.password, delay=random.randint(30, 100))
+            pass_input = self.loc(page, 'input[name="password"]')
+            await pass_input.click()
+            await asyncio.sleep(random.uniform(0.3, 0.8))
+            await pass_input.type(self.password, delay=random.randint(30, 100))
 
             self.log("已输入凭据")
         except Exception as e:
             self.log(f"输入失败: {e}", "ERROR")
             return False
         
-        self.shot(page, "github_已填写")
+        await self.shot(page, "github_已填写")
         
+        # 点击前就开始监听导航，避免页面跳得太快漏掉
         try:
-            page.locator('input[type="submit"], button[type="submit"]').first.click()
+            async with page.expect_navigation():
+                await self.loc(page, 'input[type="submit"], button[type="submit"]').first.click()
         except:
             pass
         
-        time.sleep(3)
-        page.wait_for_load_state('networkidle', timeout=30000)
-        self.shot(page, "github_登录后")
+        # 页面没安静下来不影响判断，下面按 URL 决定下一步
+        try:
+            await page.wait_for_load_state('networkidle')
+        except PlaywrightTimeout:
+            self.log("登录后页面加载超时，继续检查", "WARN")
+        await self.shot(page, "github_登录后")
         
         url = page.url
         self.log(f"当前: {url}")
         
         # 设备验证
         if 'verified-device' in url or 'device-verification' in url:
-            if not self.wait_device(page):
+            if not await self.wait_device(page):
                 return False
-            time.sleep(2)
-            page.wait_for_load_state('networkidle', timeout=30000)
-            self.shot(page, "验证后")
+            try:
+                await page.wait_for_load_state('networkidle')
+            except PlaywrightTimeout:
+                self.log("设备验证后页面加载超时，继续检查", "WARN")
+            await self.shot(page, "验证后")
         
         # 2FA
         if 'two-factor' in page.url:
             self.log("需要两步验证！", "WARN")
-            self.shot(page, "两步验证")
+            await self.shot(page, "两步验证")
             
             # GitHub Mobile：等待你在手机上批准
             if 'two-factor/mobile' in page.url:
-                if not self.wait_two_factor_mobile(page):
+                if not await self.wait_two_factor_mobile(page):
                     return False
                 # 通过后等页面稳定
                 try:
-                    page.wait_for_load_state('networkidle', timeout=30000)
-                    time.sleep(2)
+                    await page.wait_for_load_state('networkidle')
                 except:
                     pass
             
             else:
                 # 其它两步验证方式（TOTP/恢复码等），尝试通过 Telegram 输入验证码
-                if not self.handle_2fa_code_input(page):
+                if not await self.handle_2fa_code_input(page):
                     return False
                 # 通过后等页面稳定
                 try:
-                    page.wait_for_load_state('networkidle', timeout=30000)
-                    time.sleep(2)
+                    await page.wait_for_load_state('networkidle')
                 except:
                     pass
         
         # 错误
         try:
-            err = page.locator('.flash-error').first
-            if err.is_visible(timeout=2000):
-                self.log(f"错误: {err.inner_text()}", "ERROR")
+            err = self.loc(page, '.flash-error').first
+            if await err.is_visible(timeout=2000):
+                self.log(f"错误: {await err.inner_text()}", "ERROR")
                 return False
         except:
             pass
         
         return True
     
-    def oauth(self, page):
+    async def oauth(self, page):
         """处理 OAuth"""
         if 'github.com/login/oauth/authorize' in page.url:
             self.log("处理 OAuth...", "STEP")
-            self.shot(page, "oauth")
-            self.click(page, ['button[name="authorize"]', 'button:has-text("Authorize")'], "授权")
-            time.sleep(3)
-            page.wait_for_load_state('networkidle', timeout=30000)
+            await self.shot(page, "oauth")
+            await self.click(page, page.get_by_role("button", name=re.compile(r"authorize", re.I)), "授权")
+            try:
+                await page.wait_for_url(self.on_claw, timeout=30000)
+            except PlaywrightTimeout:
+                pass
     
-    def wait_redirect(self, page, wait=60):
+    async def wait_redirect(self, page, wait=60):
         """等待重定向并检测区域"""
         self.log("等待重定向...", "STEP")
-        for i in range(wait):
-            url = page.url
+        
+        def redirected(u):
+            return self.on_claw(u) and 'signin' not in u.lower()
+        
+        def authorizing(u):
+            return self.on_github(u) and '/login/oauth/authorize' in u
+        
+        deadline = time.time() + wait
+        while time.time() < deadline:
+            try:
+                await page.wait_for_url(
+                    lambda u: redirected(u) or authorizing(u),
+                    timeout=max(deadline - time.time(), 0.1) * 1000
+                )
+            except PlaywrightTimeout:
+                break
             
-            # 检查是否已跳转到 claw.cloud
-            if 'claw.cloud' in url and 'signin' not in url.lower():
+            if redirected(page.url):
                 self.log("重定向成功！", "SUCCESS")
                 
                 # 检测并记录区域
-                self.detect_region(url)
+                self.detect_region(page.url)
                 
                 return True
             
-            if 'github.com/login/oauth/authorize' in url:
-                self.oauth(page)
-            
-            time.sleep(1)
-            if i % 10 == 0:
-                self.log(f"  等待... ({i}秒)")
+            # 停在 OAuth 授权页：点授权；若仍未跳走，下一轮会再点一次，直到超时
+            await self.oauth(page)
         
-        self.log("重定向超时", "ERROR")
+        self.log(f"重定向超时，当前: {page.url}", "ERROR")
         return False
     
-    def keepalive(self, page):
+    async def keepalive(self, page):
         """保活 - 使用检测到的区域 URL"""
         self.log("保活...", "STEP")
         
@@ -657,22 +741,38 @@ class AutoLogin:
         if self.detected_region:
             self.log(f"当前区域: {self.detected_region}", "INFO")
         
-        for url, name in pages_to_visit:
+        async def visit(url, name):
+            # 每个页面单独开一个标签页，共用同一个 context（Cookie）
+            # 控制台是单页应用，必须真正加载页面，带会话的 API 请求才会发出
+            p = await page.context.new_page()
+            # 超时调短，慢页面记一笔就跳过
+            p.set_default_navigation_timeout(8000)
+            p.set_default_timeout(5000)
             try:
-                page.goto(url, timeout=30000)
-                page.wait_for_load_state('networkidle', timeout=15000)
+                await p.goto(url, wait_until='domcontentloaded')
+                # 给单页应用一点时间发出带会话的 API 请求，别在 DCL 时就关掉
+                try:
+                    await p.wait_for_load_state('networkidle', timeout=5000)
+                except PlaywrightTimeout:
+                    pass
+                
+                current_url = p.url
+                if 'signin' in current_url.lower():
+                    self.log(f"访问 {name} 被跳回登录页，会话可能已失效", "WARN")
+                    return
                 self.log(f"已访问: {name} ({url})", "SUCCESS")
                 
                 # 再次检测区域（以防中途跳转）
-                current_url = page.url
-                if 'claw.cloud' in current_url:
+                if self.on_claw(current_url):
                     self.detect_region(current_url)
-                
-                time.sleep(2)
             except Exception as e:
                 self.log(f"访问 {name} 失败: {e}", "WARN")
+            finally:
+                await p.close()
         
-        self.shot(page, "完成")
+        await asyncio.gather(*(visit(url, name) for url, name in pages_to_visit))
+        
+        await self.shot(page, "完成", force=True)
     
     def notify(self, ok, err=""):
         if not self.tg.ok:
@@ -703,7 +803,7 @@ class AutoLogin:
                 if self.shots:
                    self.tg.photo(self.shots[-1], "完成")
     
-    def run(self):
+    async def run(self):
         print("\n" + "="*50)
         print("🚀 ClawCloud 自动登录")
         print("="*50 + "\n")
@@ -718,7 +818,7 @@ class AutoLogin:
             self.notify(False, "凭据未配置")
             sys.exit(1)
         
-        with sync_playwright() as p:
+        async with async_playwright() as p:
             # 代理配置解析
             launch_args = {
                 "headless": True,
@@ -730,6 +830,16 @@ class AutoLogin:
                 ]
             }
 
+            # /dev/shm 太小（如 Docker 默认 64MB）才让 Chromium 退回磁盘 /tmp，否则用内存共享
+            try:
+                shm_total = shutil.disk_usage('/dev/shm').total
+            except OSError:
+                shm_total = 0
+            if shm_total < 256 * 1024 * 1024:
+                launch_args["args"].append('--disable-dev-shm-usage')
+            else:
+                launch_args["ignore_default_args"] = ['--disable-dev-shm-usage']
+
             if PROXY_DSN:
                 try:
                     p_url = urlparse(PROXY_DSN)
@@ -746,13 +856,19 @@ class AutoLogin:
                 except Exception as e:
                     self.log(f"代理配置解析失败: {e}", "ERROR")
 
-            browser = p.chromium.launch(**launch_args)
-            context = browser.new_context(
+            context = await p.chromium.launch_persistent_context(
+                USER_DATA_DIR,
+                **launch_args,
                 viewport={'width': 1920, 'height': 1080},
                 user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/128.0.0.0 Safari/537.36'
             )
-            page = context.new_page()
-            page.add_init_script("""
+            # 默认超时调短，ClawCloud/GitHub 异常时尽快失败
+            context.set_default_timeout(10000)
+            context.set_default_navigation_timeout(15000)
+            await context.route(BLOCKED_URL_RE, lambda route: route.abort())
+            page = context.pages[0] if context.pages else await context.new_page()
+            # 注册在 context 上，保活时新开的标签页也会生效
+            await context.add_init_script("""
                 // 基础反检测
                 Object.defineProperty(navigator, 'webdriver', {
                     get: () => undefined
@@ -781,10 +897,12 @@ class AutoLogin:
             """)
             
             try:
-                # 预加载 Cookie
-                if self.gh_session:
+                # 预加载 Cookie（profile 里已有 GitHub 会话时不覆盖，Secret 里的可能更旧）
+                if await self.get_session(context):
+                    self.log("Profile 中已有 GitHub Session", "SUCCESS")
+                elif self.gh_session:
                     try:
-                        context.add_cookies([
+                        await context.add_cookies([
                             {'name': 'user_session', 'value': self.gh_session, 'domain': 'github.com', 'path': '/'},
                             {'name': 'logged_in', 'value': 'yes', 'domain': 'github.com', 'path': '/'}
                         ])
@@ -794,40 +912,64 @@ class AutoLogin:
                 
                 # 1. 访问 ClawCloud 登录入口
                 self.log("步骤1: 打开 ClawCloud 登录页", "STEP")
-                page.goto(SIGNIN_URL, timeout=60000)
-                page.wait_for_load_state('networkidle', timeout=60000)
-                time.sleep(2)
-                self.shot(page, "clawcloud")
+                # 超时重试一次，偶发抖动能过，真挂了也不会一直等
+                for attempt in range(2):
+                    try:
+                        await page.goto(SIGNIN_URL, timeout=20000)
+                        await page.wait_for_load_state('networkidle')
+                        break
+                    except PlaywrightTimeout:
+                        if attempt:
+                            raise
+                        self.log("打开登录页超时，重试一次", "WARN")
+                await self.shot(page, "clawcloud")
                 
                 # 检查当前 URL，可能已经自动跳转到区域
-                current_url = page.url
-                self.log(f"当前 URL: {current_url}")
-  
-            
-               # 2. 点击 GitHub
-                self.log("步骤2: 点击 GitHub", "STEP")
-                if not self.click(page, [
-                    'button:has-text("GitHub")',
-                    'a:has-text("GitHub")',
-                    '[data-provider="github"]'
-                ], "GitHub"):
-                    self.log("找不到按钮", "ERROR")
-                    self.notify(False, "找不到 GitHub 按钮")
-                    sys.exit(1)
-                
-                time.sleep(3)
-                page.wait_for_load_state('networkidle', timeout=120000)
-                self.shot(page, "点击后")
                 url = page.url
-                self.log(f"当前: {url}")
+                self.log(f"当前 URL: {url}")
+                
+                # profile 中的 ClawCloud 会话仍有效时会直接跳进控制台，无需点击 GitHub
+                if 'signin' in url.lower() or 'claw.cloud' not in url:
+                    # 2. 点击 GitHub
+                    self.log("步骤2: 点击 GitHub", "STEP")
+                    github = re.compile(r"github", re.I)
+                    github_btn = page.get_by_role("button", name=github).or_(
+                        page.get_by_role("link", name=github)).or_(
+                        self.loc(page, '[data-provider="github"]'))
+                    if not await self.click(page, github_btn, "GitHub"):
+                        self.log("找不到按钮", "ERROR")
+                        # 一次 evaluate 取回页面上的按钮/链接文字，便于排查
+                        try:
+                            texts = await page.evaluate(
+                                "() => Array.from(document.querySelectorAll('button, a')).slice(0, 10).map(e => (e.innerText || '').trim().slice(0, 50))"
+                            )
+                            for t in texts:
+                                self.log(f"  - {t}")
+                        except PlaywrightError:
+                            pass
+                        await self.shot(page, "找不到按钮", force=True)
+                        self.notify(False, "找不到 GitHub 按钮")
+                        sys.exit(1)
+                    
+                    # 等跳到 GitHub（或已登录直接回到 ClawCloud）
+                    try:
+                        await page.wait_for_url(
+                            lambda u: self.on_github(u) or (self.on_claw(u) and 'signin' not in u.lower()),
+                            timeout=15000
+                        )
+                    except PlaywrightTimeout:
+                        self.log("等待跳转超时", "WARN")
+                    await self.shot(page, "点击后")
+                    url = page.url
+                    self.log(f"当前: {url}")
 
                 if 'signin' not in url.lower() and 'claw.cloud' in url and  'github.com' not in url:
                     self.log("已登录！", "SUCCESS")
                     # 检测区域
                     self.detect_region(url)
-                    self.keepalive(page)
+                    await self.keepalive(page)
                     # 提取并保存新 Cookie
-                    new = self.get_session(context)
+                    new = await self.get_session(context)
                     if new:
                         self.save_cookie(new)
                     self.notify(True)
@@ -839,23 +981,24 @@ class AutoLogin:
                 # 3. GitHub 登录
                 self.log("步骤3: GitHub 认证", "STEP")
                 
-                if 'github.com/login' in url or 'github.com/session' in url:
-                    if not self.login_github(page, context):
-                        self.shot(page, "登录失败")
+                # 授权页 URL 也以 github.com/login 开头，必须先判断
+                if self.on_github(url) and '/login/oauth/authorize' in url:
+                    self.log("Cookie 有效", "SUCCESS")
+                    await self.oauth(page)
+                elif 'github.com/login' in url or 'github.com/session' in url:
+                    if not await self.login_github(page, context):
+                        await self.shot(page, "登录失败", force=True)
                         self.notify(False, "GitHub 登录失败")
                         sys.exit(1)
-                elif 'github.com/login/oauth/authorize' in url:
-                    self.log("Cookie 有效", "SUCCESS")
-                    self.oauth(page)
                 
                 # 4. 等待重定向（会自动检测区域）
                 self.log("步骤4: 等待重定向", "STEP")
-                if not self.wait_redirect(page):
-                    self.shot(page, "重定向失败")
+                if not await self.wait_redirect(page):
+                    await self.shot(page, "重定向失败", force=True)
                     self.notify(False, "重定向失败")
                     sys.exit(1)
                 
-                self.shot(page, "重定向成功")
+                await self.shot(page, "重定向成功")
                 
                 # 5. 验证
                 self.log("步骤5: 验证", "STEP")
@@ -869,11 +1012,11 @@ class AutoLogin:
                     self.detect_region(current_url)
                 
                 # 6. 保活（使用检测到的区域 URL）
-                self.keepalive(page)
+                await self.keepalive(page)
                 
                 # 7. 提取并保存新 Cookie
                 self.log("步骤6: 更新 Cookie", "STEP")
-                new = self.get_session(context)
+                new = await self.get_session(context)
                 if new:
                     self.save_cookie(new)
                 else:
@@ -888,14 +1031,14 @@ class AutoLogin:
                 
             except Exception as e:
                 self.log(f"异常: {e}", "ERROR")
-                self.shot(page, "异常")
+                await self.shot(page, "异常", force=True)
                 import traceback
                 traceback.print_exc()
                 self.notify(False, str(e))
                 sys.exit(1)
             finally:
-                browser.close()
+                await context.close()
 
 
 if __name__ == "__main__":
-    AutoLogin().run()
+    asyncio.run(AutoLogin().run())